@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+"""
+Офлайн-прогон бота на синтетических обновлениях.
+
+Обновления из JSONL-корпуса (или сгенерированные) подаются в настоящий
+Application из main.build_application(), а вместо Telegram используется
+поддельный транспорт Bot API: он записывает вызовы и может добавлять задержку
+и ошибки. В конце выводится пропускная способность, перцентили времени
+обработчиков и количество вызовов Bot API по методам.
+
+С --transport polling обновления отдаются боту через поддельный getUpdates,
+с --transport webhook — отправляются POST-запросами во встроенный HTTP-сервер
+вебхука; по умолчанию они кладутся прямо в очередь Application.
+
+С --cluster-workers N корпус по очереди прогоняется через 1..N процессов
+кластерного режима, которые разбирают общую таблицу update_queue; роль
+ведущего (запись обновлений в очередь) выполняет сам replay.py.
+
+Примеры:
+    python replay.py --pg-tmp --messages 5000
+    python replay.py --pg-tmp --messages 5000 --concurrent-updates 64 --api-latency 0.05
+    python replay.py --pg-tmp --messages 20000 --chats 500
+    python replay.py --pg-tmp --messages 20000 --chats 500 --api-latency 0.05 \\
+        --cluster-workers 4
+    python replay.py --database-url postgresql://user@localhost/test_db \\
+        --corpus updates.jsonl --api-latency 0.05 --api-error-rate 0.01
+    python replay.py --pg-tmp --cold-start 5 --api-latency 0.05
+    python replay.py --pg-tmp --messages 20000 --transport polling
+    python replay.py --pg-tmp --messages 20000 --transport webhook
+
+Строка корпуса — либо полный JSON объекта Update (с полем update_id), либо
+упрощённая запись {"user_id": ..., "text": ..., "chat_id": ..., "thread_id": ...}.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from telegram import Update
+from telegram.request import BaseRequest
+
+# main.py проверяет конфигурацию при импорте; прогону нужны лишь правдоподобные
+# значения: Bot API поддельный, а адрес БД задаётся аргументами
+os.environ.setdefault("FRONTENDTGBOT_TOKEN", "1:replay-token")
+os.environ.setdefault("FRONTENDTGBOT_DATABASE_URL", "postgresql://replay@localhost/replay")
+
+import main  # noqa: E402
+
+ADMIN_USER_ID = 1000
+BOT_USER_ID = 1
+SAMPLE_TEXTS = [
+    "Привет всем! Кто-нибудь настраивал vite с monorepo?",
+    "Подскажите, как типизировать generic-компонент в React?",
+    "Спасибо, заработало",
+    "А есть хороший курс по CSS grid?",
+    "Посмотрите мой PR, пожалуйста",
+]
+
+
+# ========= Поддельный Bot API =========
+class FakeBotRequest(BaseRequest):
+    """Транспорт Bot API, который отвечает сразу (или с задержкой) без сети."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.errors = Counter()
+        self._message_id = 0
+        self.updates = deque()             # обновления для getUpdates (--transport polling)
+        self.confirmed_offset = 0
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _result(self, endpoint: str, params: dict):
+        if endpoint == "getMe":
+            return {
+                "id": BOT_USER_ID,
+                "is_bot": True,
+                "first_name": "frontendtgbot",
+                "username": "frontendtgbot",
+            }
+        if endpoint == "getChatAdministrators":
+            return [
+                {
+                    "status": "creator",
+                    "is_anonymous": False,
+                    "user": {"id": ADMIN_USER_ID, "is_bot": False, "first_name": "Admin"},
+                }
+            ]
+        if endpoint == "sendMessage":
+            self._message_id += 1
+            return {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "supergroup"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+    async def _get_updates(self, params: dict):
+        """getUpdates: подтверждённые (update_id < offset) обновления удаляются из очереди."""
+        offset = int(params.get("offset") or 0)
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        self.confirmed_offset = max(self.confirmed_offset, offset)
+        if not self.updates:
+            # Long polling без новых обновлений
+            await asyncio.sleep(0.01)
+        return [self.updates[index] for index in range(min(100, len(self.updates)))]
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors[endpoint] += 1
+            return 500, json.dumps(
+                {"ok": False, "error_code": 500, "description": "Injected error"}
+            ).encode()
+        params = request_data.parameters if request_data else {}
+        if endpoint == "getUpdates":
+            result = await self._get_updates(params)
+        else:
+            result = self._result(endpoint, params)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+# ========= Корпус обновлений =========
+def make_update(update_id: int, chat_id: int, user_id: int, text: str, thread_id=None):
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "supergroup", "title": "frontend"},
+        "from": {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"user{user_id}",
+            "username": f"user{user_id}",
+        },
+        "text": text,
+    }
+    if thread_id:
+        message["message_thread_id"] = thread_id
+        message["is_topic_message"] = True
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def load_corpus(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for update_id, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if "update_id" in data:
+                yield data
+            else:
+                yield make_update(
+                    update_id,
+                    data.get("chat_id", main.FRONTEND_CHAT_ID),
+                    data["user_id"],
+                    data["text"],
+                    data.get("thread_id"),
+                )
+
+
+def synthetic_routes(chats: int):
+    """Чат из конфигурации и ещё chats - 1 синтетических с темами в той же группе администраторов."""
+    routes = [main.DEFAULT_ROUTE]
+    for index in range(1, chats):
+        routes.append(
+            main.ChatRoute(
+                main.FRONTEND_CHAT_ID - index,
+                main.ADMIN_GROUP_ID,
+                1_000_000 + 2 * index,
+                1_000_001 + 2 * index,
+            )
+        )
+    return routes
+
+
+def synthetic_corpus(
+    count: int, users: int, violation_rate: float, command_rate: float, routes
+):
+    """Генерирует сообщения в чаты из routes, часть с нарушениями, и команды администраторов."""
+    keywords = main.BANNED_KEYWORDS or ["запрещенное_слово"]
+    for update_id in range(1, count + 1):
+        roll = random.random()
+        route = random.choice(routes)
+        if roll < command_rate:
+            target = random.randrange(10_000, 10_000 + users)
+            yield make_update(
+                update_id,
+                route.admin_group_id,
+                ADMIN_USER_ID,
+                f"/warn {target} спам 3",
+                route.bot_thread_id,
+            )
+            continue
+        # Номер в конце делает тексты разными, иначе сработает защита от рассылок
+        text = f"{random.choice(SAMPLE_TEXTS)} ({update_id})"
+        if roll < command_rate + violation_rate:
+            text = f"{text} {random.choice(keywords)}"
+        yield make_update(
+            update_id,
+            route.chat_id,
+            random.randrange(10_000, 10_000 + users),
+            text,
+        )
+
+
+# ========= Временный PostgreSQL =========
+@contextmanager
+def temporary_postgres():
+    """Поднимает одноразовый кластер PostgreSQL (нужны initdb и pg_ctl в PATH)."""
+    if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+        raise SystemExit("Для --pg-tmp нужны initdb и pg_ctl в PATH")
+    data_dir = tempfile.mkdtemp(prefix="frontendtgbot-pg-")
+    port = random.randrange(20_000, 30_000)
+    subprocess.run(
+        ["initdb", "-D", data_dir, "-U", "frontendtgbot_db_admin", "-A", "trust"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        [
+            "pg_ctl", "-D", data_dir, "-w", "-l", os.path.join(data_dir, "server.log"),
+            "-o", f"-k {data_dir} -p {port} -c listen_addresses=''",
+            "start",
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        yield f"postgresql://frontendtgbot_db_admin@/postgres?host={data_dir}&port={port}"
+    finally:
+        subprocess.run(
+            ["pg_ctl", "-D", data_dir, "-m", "fast", "stop"],
+            stdout=subprocess.DEVNULL,
+        )
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+# ========= Прогон =========
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def start_application(fake_request: FakeBotRequest, routes=None):
+    await main.prepare_database()
+    if routes:
+        # Синтетические чаты живут только в памяти, таблица chats не меняется
+        main.set_chat_routes(routes)
+    application = main.build_application(
+        request=fake_request, get_updates_request=fake_request
+    )
+    await main.compile_banned_keywords()
+    await application.initialize()
+    await application.start()
+    log_dispatcher = asyncio.create_task(main.run_log_dispatcher(application.bot))
+    return application, log_dispatcher
+
+
+async def deliver_by_polling(application, updates, fake_request: FakeBotRequest):
+    """Отдаёт обновления через getUpdates и ждёт, пока updater подтвердит последнее."""
+    if not updates:
+        return
+    fake_request.updates.extend(updates)
+    last_update_id = updates[-1]["update_id"]
+    await application.updater.start_polling(
+        poll_interval=0, timeout=0, allowed_updates=Update.ALL_TYPES
+    )
+    while fake_request.confirmed_offset <= last_update_id:
+        await asyncio.sleep(0.005)
+    await application.updater.stop()
+
+
+async def deliver_by_webhook(application, updates, connections: int):
+    """Отправляет обновления во встроенный сервер вебхука, как это делает Telegram."""
+    import aiohttp
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    main.WEBHOOK_LISTEN, main.WEBHOOK_PORT = "127.0.0.1", port
+    main.WEBHOOK_URL = f"https://replay.invalid{main.WEBHOOK_PATH}"
+    main.WEBHOOK_SECRET_TOKEN = "replay-secret"
+    url = f"http://127.0.0.1:{port}{main.WEBHOOK_PATH}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": main.WEBHOOK_SECRET_TOKEN}
+    runner = await main.start_webhook(application)
+    pending = iter(updates)
+    rejected = Counter()
+
+    async def connection(session):
+        for data in pending:
+            while True:
+                async with session.post(url, json=data, headers=headers) as response:
+                    if response.status == 200:
+                        break
+                    # 503 — очередь бота заполнена, Telegram повторил бы доставку
+                    rejected[response.status] += 1
+                await asyncio.sleep(0.01)
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(connection(session) for _ in range(connections)))
+    finally:
+        await runner.cleanup()
+    return dict(rejected)
+
+
+async def replay(updates, fake_request: FakeBotRequest, routes=None, transport="queue"):
+    samples = defaultdict(list)
+    observe_latency = main.observe_latency
+
+    def record_latency(metric, label, seconds):
+        if metric == "handler":
+            samples[label].append(seconds)
+        observe_latency(metric, label, seconds)
+
+    main.observe_latency = record_latency
+    application, log_dispatcher = await start_application(fake_request, routes)
+
+    started = time.perf_counter()
+    rejected = {}
+    if transport == "polling":
+        await deliver_by_polling(application, updates, fake_request)
+    elif transport == "webhook":
+        rejected = await deliver_by_webhook(application, updates, main.WEBHOOK_MAX_CONNECTIONS)
+    else:
+        for data in updates:
+            await application.update_queue.put(Update.de_json(data, application.bot))
+    await application.update_queue.join()
+    elapsed = time.perf_counter() - started
+    processed = len(updates)
+
+    log_dispatcher.cancel()
+    await application.stop()
+    await application.shutdown()
+    await main.run_db(main.flush_user_cache)
+    main.observe_latency = observe_latency
+    return {
+        "transport": transport,
+        "updates": processed,
+        "chats": len(main.CHAT_ROUTES),
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(processed / elapsed, 1) if elapsed else None,
+        "handlers": {
+            name: {
+                "calls": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            }
+            for name, values in sorted(samples.items())
+        },
+        "api_calls": dict(fake_request.calls.most_common()),
+        "api_calls_total": sum(fake_request.calls.values()),
+        "api_errors_injected": sum(fake_request.errors.values()),
+        "log_events_pending": main._log_queue.qsize(),
+        "webhook_rejected": rejected,
+    }
+
+
+# ========= Холодный старт =========
+def drop_schema():
+    with main.db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {main.SCHEMA} CASCADE;")
+
+
+def reset_db_pool():
+    """Закрывает соединения пула, не останавливая исполнитель run_db."""
+    with main._db_pool_lock:
+        if main._db_pool is not None:
+            main._db_pool.closeall()
+            main._db_pool = None
+            main._db_last_used.clear()
+
+
+async def cold_start(fake_request: FakeBotRequest, sequential: bool) -> float:
+    """
+    Возвращает время от начала запуска до обработки первого обновления, с.
+    sequential воспроизводит прежний запуск: DDL при каждом старте, шаги
+    по очереди и отправка сообщений о подключении до приёма обновлений.
+    """
+    if sequential:
+        await main.run_db(drop_schema)
+    await asyncio.to_thread(reset_db_pool)
+    started = time.perf_counter()
+    application = main.build_application(
+        request=fake_request, get_updates_request=fake_request
+    )
+    steps = [
+        main.prepare_database(),
+        main.compile_banned_keywords(),
+        main.compile_toxicity_model(),
+        application.initialize(),
+    ]
+    announce = None
+    if sequential:
+        for step in steps:
+            await step
+        await main.on_startup(application)
+    else:
+        await asyncio.gather(*steps)
+        announce = asyncio.create_task(main.on_startup(application))
+    await application.start()
+    update = make_update(1, main.FRONTEND_CHAT_ID, 10_000, SAMPLE_TEXTS[0])
+    await application.update_queue.put(Update.de_json(update, application.bot))
+    await application.update_queue.join()
+    elapsed = time.perf_counter() - started
+    if announce is not None:
+        await announce
+    await application.stop()
+    await application.shutdown()
+    return elapsed
+
+
+async def measure_cold_start(fake_request: FakeBotRequest, runs: int) -> dict:
+    results = {"до": [], "после": []}
+    for _ in range(runs):
+        results["до"].append(await cold_start(fake_request, sequential=True))
+        results["после"].append(await cold_start(fake_request, sequential=False))
+    return {
+        name: {
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+        for name, values in results.items()
+    }
+
+
+def print_cold_start_report(report: dict):
+    print("Запуск | до первого обновления p50/max, мс")
+    for name, stats in report.items():
+        print(f"{name:>6} | {stats['p50_ms']}/{stats['max_ms']}")
+
+
+# ========= Кластерный режим =========
+def clear_update_queue():
+    with main.db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"TRUNCATE {main.SCHEMA}.update_queue;")
+
+
+def count_queued_updates() -> int:
+    with main.db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {main.SCHEMA}.update_queue;")
+            return cur.fetchone()[0]
+
+
+async def cluster_worker(fake_request: FakeBotRequest, routes):
+    """Процесс-узел: разбирает очередь до SIGTERM (без выбора ведущего)."""
+    application, log_dispatcher = await start_application(fake_request, routes)
+    stop_event = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+    print("ready", flush=True)
+    await main.run_queue_worker(application, stop_event)
+    log_dispatcher.cancel()
+    await application.stop()
+    await application.shutdown()
+    await main.run_db(main.flush_user_cache)
+
+
+def spawn_workers(args, database_url: str, count: int):
+    processes = []
+    for index in range(1, count + 1):
+        env = dict(
+            os.environ,
+            FRONTENDTGBOT_CLUSTER_NODE=f"replay{index}",
+            FRONTENDTGBOT_DATABASE_URL=database_url,
+            FRONTENDTGBOT_METRICS_PORT="0",
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), "--cluster-node-worker",
+            "--database-url", database_url,
+            "--chats", str(args.chats),
+            "--api-latency", str(args.api_latency),
+            "--api-error-rate", str(args.api_error_rate),
+            "--seed", str(args.seed + index),
+        ]
+        processes.append(
+            subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+        )
+    for process in processes:
+        if process.stdout.readline().strip() != "ready":
+            raise SystemExit("Узел кластера не запустился")
+    return processes
+
+
+def stop_workers(processes):
+    for process in processes:
+        process.send_signal(signal.SIGTERM)
+    for process in processes:
+        process.wait()
+
+
+def measure_cluster(args, database_url: str, updates, workers: int) -> dict:
+    """Запускает workers узлов, кладёт корпус в очередь и ждёт, пока она опустеет."""
+    clear_update_queue()
+    processes = spawn_workers(args, database_url, workers)
+    try:
+        started = time.perf_counter()
+        for offset in range(0, len(updates), 1000):
+            chunk = updates[offset:offset + 1000]
+            main.enqueue_updates(
+                [
+                    (
+                        data["update_id"],
+                        main._update_chat_key(Update.de_json(data, None)),
+                        json.dumps(data, ensure_ascii=False),
+                    )
+                    for data in chunk
+                ],
+                chunk[-1]["update_id"] + 1,
+            )
+        while count_queued_updates():
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_workers(processes)
+    return {
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(updates) / elapsed, 1) if elapsed else None,
+    }
+
+
+def print_cluster_report(results):
+    base = results[0]["updates_per_second"] or 1
+    print("Узлов | обновлений в секунду | ускорение")
+    for result in results:
+        print(
+            f"{result['workers']:5} | {result['updates_per_second']:20} | "
+            f"{result['updates_per_second'] / base:.2f}x"
+        )
+
+
+def print_report(report: dict):
+    print(
+        f"Обработано обновлений ({report['transport']}): {report['updates']} за "
+        f"{report['seconds']} с ({report['updates_per_second']} в секунду), "
+        f"чатов: {report['chats']}"
+    )
+    print("Обработчики (вызовы, p50/p95/p99 мс):")
+    for name, stats in report["handlers"].items():
+        print(
+            f"  {name}: {stats['calls']}, "
+            f"{stats['p50_ms']}/{stats['p95_ms']}/{stats['p99_ms']}"
+        )
+    print(
+        f"Вызовы Bot API: {report['api_calls_total']} "
+        f"(ошибок внедрено: {report['api_errors_injected']})"
+    )
+    for endpoint, count in report["api_calls"].items():
+        print(f"  {endpoint}: {count}")
+    print(f"Событий логов в очереди: {report['log_events_pending']}")
+    if report["webhook_rejected"]:
+        print(f"Отклонено вебхуком (повторено): {report['webhook_rejected']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    db = parser.add_mutually_exclusive_group(required=True)
+    db.add_argument("--database-url", help="тестовая база PostgreSQL")
+    db.add_argument(
+        "--pg-tmp", action="store_true", help="поднять одноразовый PostgreSQL"
+    )
+    parser.add_argument("--corpus", help="JSONL-файл с обновлениями")
+    parser.add_argument("--messages", type=int, default=2000, help="размер синтетического корпуса")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument(
+        "--chats", type=int, default=1, help="число модерируемых чатов в синтетическом корпусе"
+    )
+    parser.add_argument("--violation-rate", type=float, default=0.05)
+    parser.add_argument("--command-rate", type=float, default=0.01)
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка Bot API, с")
+    parser.add_argument("--api-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--transport",
+        choices=("queue", "polling", "webhook"),
+        default="queue",
+        help="как обновления попадают в бота",
+    )
+    parser.add_argument(
+        "--concurrent-updates",
+        type=int,
+        default=main.CONCURRENT_UPDATES,
+        help="обновлений, обрабатываемых одновременно",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--cluster-workers",
+        type=int,
+        default=0,
+        help="замерить кластерный режим на 1..N узлах (нужно --chats > 1)",
+    )
+    parser.add_argument(
+        "--cold-start",
+        type=int,
+        default=0,
+        metavar="RUNS",
+        help="замерить время до первого обновления: прежний запуск против текущего",
+    )
+    parser.add_argument("--cluster-node-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def run(args, database_url: str):
+    random.seed(args.seed)
+    main.DATABASE_URL = database_url
+    # Журнал кэша пользователей не должен смешиваться с боевым
+    main.USER_JOURNAL_FILE = os.path.join(
+        tempfile.gettempdir(), f"replay.{main.CLUSTER_NODE or 'punishments'}.journal"
+    )
+    main.METRICS_PORT = 0
+    main.CONCURRENT_UPDATES = args.concurrent_updates
+    if args.cluster_node_worker:
+        fake_request = FakeBotRequest(args.api_latency, args.api_error_rate)
+        routes = synthetic_routes(args.chats) if args.chats > 1 else None
+        try:
+            asyncio.run(cluster_worker(fake_request, routes))
+        finally:
+            main.close_db_pool()
+        return
+    if args.cold_start:
+        fake_request = FakeBotRequest(args.api_latency, args.api_error_rate)
+        try:
+            report = asyncio.run(measure_cold_start(fake_request, args.cold_start))
+        finally:
+            main.close_db_pool()
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            print_cold_start_report(report)
+        return
+    routes = None
+    if args.corpus:
+        updates = list(load_corpus(args.corpus))
+    else:
+        routes = synthetic_routes(args.chats) if args.chats > 1 else None
+        updates = list(
+            synthetic_corpus(
+                args.messages,
+                args.users,
+                args.violation_rate,
+                args.command_rate,
+                routes or [main.DEFAULT_ROUTE],
+            )
+        )
+    if args.cluster_workers:
+        try:
+            asyncio.run(main.prepare_database())
+            results = [
+                measure_cluster(args, database_url, updates, workers)
+                for workers in range(1, args.cluster_workers + 1)
+            ]
+        finally:
+            main.close_db_pool()
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            print_cluster_report(results)
+        return
+    fake_request = FakeBotRequest(args.api_latency, args.api_error_rate)
+    try:
+        report = asyncio.run(replay(updates, fake_request, routes, args.transport))
+    finally:
+        main.close_db_pool()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    if args.pg_tmp:
+        with temporary_postgres() as database_url:
+            run(args, database_url)
+    else:
+        run(args, args.database_url)
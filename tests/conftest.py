@@ -0,0 +1,48 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# main.py читает конфигурацию при импорте; тестам нужны только корректные значения
+os.environ.setdefault("FRONTENDTGBOT_TOKEN", "1:test-token")
+os.environ.setdefault("FRONTENDTGBOT_DATABASE_URL", "postgresql://test@localhost/test")
+os.environ.setdefault("FRONTENDTGBOT_CONFIG", os.devnull + ".missing")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def postgres_url():
+    """
+    Адрес PostgreSQL для интеграционных тестов: FRONTENDTGBOT_TEST_DATABASE_URL
+    или одноразовый кластер (нужны initdb и pg_ctl). Без них тесты пропускаются.
+    """
+    url = os.environ.get("FRONTENDTGBOT_TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+        pytest.skip("нужен PostgreSQL: FRONTENDTGBOT_TEST_DATABASE_URL или initdb в PATH")
+    import replay
+
+    with replay.temporary_postgres() as url:
+        yield url
+
+
+@pytest.fixture
+def postgres(postgres_url, monkeypatch, tmp_path):
+    """Чистая схема бота в тестовой базе; пул соединений main смотрит в неё."""
+    import main
+    import replay
+
+    monkeypatch.setattr(main, "DATABASE_URL", postgres_url)
+    monkeypatch.setattr(main, "USER_JOURNAL_FILE", str(tmp_path / "punishments.journal"))
+    monkeypatch.setattr(main, "_journal_file", None)
+    replay.reset_db_pool()
+    replay.drop_schema()
+    main.init_db_postgres()
+    yield main
+    if main._journal_file is not None:
+        main._journal_file.close()
+    replay.drop_schema()
+    replay.reset_db_pool()
@@ -0,0 +1,282 @@
+import asyncio
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from telegram import Update
+from telegram.error import Conflict
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(main, "CLUSTER_LEADER_RETRY", 0.01)
+    monkeypatch.setattr(main, "_cluster_leader", False)
+
+
+class FakeUpdate:
+    def __init__(self, update_id):
+        self.update_id = update_id
+        self.effective_chat = SimpleNamespace(id=-100)
+        self.effective_message = None
+        self.effective_user = None
+
+    def to_dict(self):
+        return {"update_id": self.update_id}
+
+
+def test_ingest_survives_database_and_conflict_errors(monkeypatch):
+    offsets, enqueued = [], []
+    offset_failures = [psycopg2.OperationalError("connection refused")]
+
+    def load_update_offset():
+        if offset_failures:
+            raise offset_failures.pop()
+        return 10
+
+    def enqueue_updates(rows, offset):
+        enqueued.append((rows, offset))
+        return len(rows)
+
+    async def run_db(func, *args):
+        return func(*args)
+
+    class Bot:
+        def __init__(self):
+            self.responses = [Conflict("terminated by other getUpdates request"), [FakeUpdate(10)]]
+            self.done = asyncio.Event()
+
+        async def delete_webhook(self):
+            pass
+
+        async def get_updates(self, offset, timeout, allowed_updates):
+            offsets.append(offset)
+            if not self.responses:
+                self.done.set()
+                await asyncio.Event().wait()
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+    monkeypatch.setattr(main, "load_update_offset", load_update_offset)
+    monkeypatch.setattr(main, "enqueue_updates", enqueue_updates)
+    monkeypatch.setattr(main, "run_db", run_db)
+
+    async def scenario():
+        bot = Bot()
+        task = asyncio.create_task(main.run_update_ingest(bot))
+        await asyncio.wait_for(bot.done.wait(), 5)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert offsets == [10, 10, 11]
+    assert enqueued == [([(10, -100, '{"update_id": 10}')], 11)]
+
+
+def test_leader_gives_up_lock_when_ingest_dies(monkeypatch):
+    connections, ingest_starts = [], []
+
+    class FakeConnection:
+        def __init__(self):
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    def open_cluster_connection():
+        conn = FakeConnection()
+        connections.append(conn)
+        return conn
+
+    async def run_update_ingest(bot):
+        ingest_starts.append(bot)
+        if len(ingest_starts) == 1:
+            raise Conflict("terminated by other getUpdates request")
+        await asyncio.Event().wait()
+
+    async def run_timer_dispatcher(bot, poll_interval=None):
+        await asyncio.Event().wait()
+
+    async def on_startup(application):
+        pass
+
+    monkeypatch.setattr(main, "open_cluster_connection", open_cluster_connection)
+    monkeypatch.setattr(main, "try_acquire_leadership", lambda conn: True)
+    monkeypatch.setattr(main, "check_connection", lambda conn: None)
+    monkeypatch.setattr(main, "run_update_ingest", run_update_ingest)
+    monkeypatch.setattr(main, "run_timer_dispatcher", run_timer_dispatcher)
+    monkeypatch.setattr(main, "on_startup", on_startup)
+
+    async def scenario():
+        stop_event = asyncio.Event()
+        election = asyncio.create_task(
+            main.run_leader_election(SimpleNamespace(bot="bot"), stop_event)
+        )
+        for _ in range(500):
+            await asyncio.sleep(0.01)
+            if len(ingest_starts) == 2:
+                break
+        assert main._cluster_leader
+        stop_event.set()
+        await election
+
+    asyncio.run(scenario())
+    # Первое соединение закрыто — блокировка отпущена, затем узел снова стал ведущим
+    assert len(ingest_starts) == 2
+    assert len(connections) == 2
+    assert all(conn.closed for conn in connections)
+    assert not main._cluster_leader
+
+
+class FakeQueue:
+    """update_queue в памяти: аренда самого старого обновления каждого чата."""
+
+    def __init__(self, updates):
+        self.rows = dict(updates)              # update_id -> chat_id
+        self.claimed = set()
+        self.acked = []
+        self.renewed = []
+
+    def claim_updates(self, limit):
+        heads = {}
+        for update_id, chat_id in sorted(self.rows.items()):
+            heads.setdefault(chat_id, update_id)
+        free = sorted(set(heads.values()) - self.claimed)[:limit]
+        self.claimed.update(free)
+        return [(update_id, {"update_id": update_id}) for update_id in free]
+
+    def ack_update(self, update_id):
+        del self.rows[update_id]
+        self.claimed.discard(update_id)
+        self.acked.append(update_id)
+        return True
+
+    def renew_leases(self, update_ids):
+        self.renewed.append(sorted(update_ids))
+        return len(update_ids)
+
+
+def test_slow_handler_blocks_only_its_own_chat(monkeypatch):
+    # Чат 1: медленная команда и следующее за ней сообщение; чаты 2..4 — по два сообщения
+    queue = FakeQueue({1: 1, 2: 2, 3: 3, 4: 4, 5: 1, 6: 2, 7: 3, 8: 4})
+    processed = []
+
+    async def run_db(func, *args):
+        return func(*args)
+
+    monkeypatch.setattr(main, "run_db", run_db)
+    monkeypatch.setattr(main, "claim_updates", queue.claim_updates)
+    monkeypatch.setattr(main, "ack_update", queue.ack_update)
+    monkeypatch.setattr(main, "renew_leases", queue.renew_leases)
+    monkeypatch.setattr(main, "release_leases", lambda: None)
+    monkeypatch.setattr(main, "flush_user_cache", lambda: 0)
+    monkeypatch.setattr(main, "CLUSTER_IDLE_SLEEP", 0.001)
+    monkeypatch.setattr(main, "CLUSTER_LEASE_RENEW", 0.01)
+    monkeypatch.setattr(main.Update, "de_json", lambda data, bot: data["update_id"])
+
+    async def scenario():
+        slow_done = asyncio.Event()
+
+        async def process_update(update_id):
+            if update_id == 1:
+                await slow_done.wait()
+            processed.append(update_id)
+
+        stop_event = asyncio.Event()
+        application = SimpleNamespace(bot=None, process_update=process_update)
+        worker = asyncio.create_task(main.run_queue_worker(application, stop_event))
+        for _ in range(500):
+            await asyncio.sleep(0.005)
+            if len(queue.acked) == 6 and queue.renewed:
+                break
+        # Остальные чаты обработаны полностью, пока команда в чате 1 ещё идёт
+        assert sorted(queue.acked) == [2, 3, 4, 6, 7, 8]
+        assert 5 not in processed
+        assert queue.renewed[-1] == [1]
+        slow_done.set()
+        for _ in range(500):
+            await asyncio.sleep(0.005)
+            if not queue.rows:
+                break
+        stop_event.set()
+        await worker
+
+    asyncio.run(scenario())
+    assert processed.index(5) > processed.index(1)
+    assert not queue.rows
+
+
+def test_busy_metrics_port_does_not_stop_the_node(monkeypatch):
+    async def scenario():
+        # Порт уже занят другим узлом
+        other_node = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+        monkeypatch.setattr(main, "METRICS_HOST", "127.0.0.1")
+        monkeypatch.setattr(main, "METRICS_PORT", other_node.sockets[0].getsockname()[1])
+        try:
+            return await main.start_metrics_server()
+        finally:
+            other_node.close()
+            await other_node.wait_closed()
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_admin_demoted_on_another_node_loses_access(monkeypatch):
+    versions = {}
+    chat_id = main.FRONTEND_CHAT_ID
+
+    async def run_db(func, *args):
+        return func(*args)
+
+    def bump_admin_version(chat_id):
+        versions[chat_id] = versions.get(chat_id, 0) + 1
+        return versions[chat_id]
+
+    class Bot:
+        admins = [1, 2]
+
+        async def get_chat_administrators(self, chat_id):
+            return [SimpleNamespace(user=SimpleNamespace(id=user_id)) for user_id in self.admins]
+
+    monkeypatch.setattr(main, "CLUSTER_MODE", True)
+    monkeypatch.setattr(main, "run_db", run_db)
+    monkeypatch.setattr(main, "load_admin_version", lambda chat_id: versions.get(chat_id, 0))
+    monkeypatch.setattr(main, "bump_admin_version", bump_admin_version)
+    for name in ("_admin_ids", "_admin_ids_expires", "_admin_refresh_tasks"):
+        monkeypatch.setattr(main, name, {})
+    monkeypatch.setattr(main, "_admin_ids_version", main.defaultdict(int))
+    context = SimpleNamespace(bot=Bot())
+
+    async def scenario():
+        assert await main.is_chat_admin(2, chat_id, context)
+        # Другой узел получил chat_member о снятии администратора 2
+        Bot.admins = [1]
+        main.bump_admin_version(chat_id)
+        assert not await main.is_chat_admin(2, chat_id, context)
+        assert await main.is_chat_admin(1, chat_id, context)
+
+    asyncio.run(scenario())
+
+
+def test_admin_commands_are_ordered_with_their_chat():
+    route = main.DEFAULT_ROUTE
+    command = Update.de_json(
+        {
+            "update_id": 1,
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": route.admin_group_id, "type": "supergroup"},
+                "from": {"id": 7, "is_bot": False, "first_name": "Admin"},
+                "message_thread_id": route.bot_thread_id,
+                "is_topic_message": True,
+                "text": "/ban 42 спам 24",
+            },
+        },
+        None,
+    )
+    assert main._update_chat_key(command) == route.chat_id
+    assert main._update_chat_key(FakeUpdate(1)) == -100
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+
+import pytest
+
+import replay
+
+
+@pytest.fixture
+def bot_db(postgres, monkeypatch):
+    main = postgres
+    monkeypatch.setattr(main, "_user_cache", OrderedDict())
+    monkeypatch.setattr(main, "_pending_punishments", [])
+    monkeypatch.setattr(main, "_unflushed_users", defaultdict(int))
+    return main
+
+
+def test_handler_latency_at_64_concurrent_updates(bot_db):
+    """Пул БД не блокирует цикл событий: 64 обработчика идут параллельно."""
+    main = bot_db
+    chat_id = main.FRONTEND_CHAT_ID
+    concurrency = 64
+
+    async def handler(user_id):
+        # Путь нарушения: запись пользователя, предупреждение, сброс в БД
+        started = time.perf_counter()
+        await main.run_db(main.get_user, chat_id, user_id)
+        await main.run_db(
+            main.add_punishment, chat_id, user_id, "user", "warn", "спам", 3, "bot"
+        )
+        await main.run_db(main.flush_user_cache)
+        return time.perf_counter() - started
+
+    async def measure():
+        lag = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lag.append(time.perf_counter() - started - 0.001)
+
+        probe_task = asyncio.create_task(probe())
+        latencies = []
+        for wave in range(5):
+            latencies += await asyncio.gather(
+                *(handler(10_000 + wave * concurrency + n) for n in range(concurrency))
+            )
+        done.set()
+        await probe_task
+        return latencies, lag
+
+    latencies, lag = asyncio.run(measure())
+    p50 = replay.percentile(latencies, 0.50)
+    p99 = replay.percentile(latencies, 0.99)
+    print(
+        f"{concurrency} параллельных обработчиков: p50 {p50 * 1000:.1f} мс, "
+        f"p99 {p99 * 1000:.1f} мс, задержка цикла событий max {max(lag) * 1000:.1f} мс"
+    )
+    assert p99 < 1.0
+    # Запросы к БД идут в потоках: цикл событий не простаивает в ожидании Postgres
+    assert max(lag) < 0.05
+
+
+def seed_punishments(main, chat_id: int, users: int, rows: int, days: int = 30):
+    """Добавляет rows наказаний users пользователям (ID от 10000) за последние days дней."""
+    with main.db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f'''
+                INSERT INTO {main.SCHEMA}.users (chat_id, user_id, join_date, alias, warns, bans)
+                SELECT %s, 10000 + g, now(), 'user' || g, 0, 0
+                FROM generate_series(0, %s - 1) AS g
+                ON CONFLICT DO NOTHING;
+                ''',
+                (chat_id, users),
+            )
+            cur.execute(
+                f'''
+                INSERT INTO {main.SCHEMA}.punishments
+                    (chat_id, user_id, type, reason, duration, issued_by, issued_at)
+                SELECT %s, 10000 + g %% %s,
+                       (ARRAY['warn', 'warn', 'warn', 'mute', 'ban'])[1 + g %% 5],
+                       'seed', 3, 'admin' || g %% 7, now() - (g %% %s) * interval '1 day'
+                FROM generate_series(1, %s) AS g;
+                ''',
+                (chat_id, users, days, rows),
+            )
+            cur.execute(f"ANALYZE {main.SCHEMA}.punishments;")
+
+
+def warn_event(chat_id: int, user_id: int, n: int):
+    return {
+        "event_id": f"bench-{user_id}-{n}",
+        "chat_id": chat_id,
+        "user_id": user_id,
+        "alias": "user",
+        "type": "warn",
+        "reason": "спам",
+        "duration": 3,
+        "issued_by": "admin",
+        "issued_at": "2026-01-01 00:00:00",
+    }
+
+
+def test_insert_cost_is_flat_as_history_grows(bot_db):
+    """Новое наказание — одна строка, а не перезапись всей истории пользователя."""
+    main = bot_db
+    chat_id, user_id = main.FRONTEND_CHAT_ID, 10000
+    costs = {}
+    seeded = 0
+    for history in (0, 10_000, 100_000):
+        if history > seeded:
+            seed_punishments(main, chat_id, 1, history - seeded)
+            seeded = history
+        started = time.perf_counter()
+        for n in range(200):
+            with main.db_connection() as conn:
+                with conn.cursor() as cur:
+                    main._write_punishments(cur, [warn_event(chat_id, user_id, history + n)])
+        costs[history] = (time.perf_counter() - started) / 200
+        print(f"История {history} записей: {costs[history] * 1000:.2f} мс на наказание")
+    assert costs[100_000] < 3 * costs[0] + 0.001
+
+
+def test_stats_and_history_under_100ms_on_1m_rows(bot_db):
+    main = bot_db
+    chat_id = main.FRONTEND_CHAT_ID
+    # Агрегаты /stats наполняет триггер при вставке, как и в работе бота
+    seed_punishments(main, chat_id, users=50_000, rows=1_000_000, days=365)
+
+    def slowest(func, *args):
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            result = func(*args)
+            timings.append(time.perf_counter() - started)
+        return max(timings), result
+
+    results = {}
+    for days in (main.STATS_DEFAULT_DAYS, main.STATS_MAX_DAYS):
+        results[f"/stats {days}"], (by_type, _, top) = slowest(
+            main.get_moderation_stats, chat_id, days
+        )
+        assert by_type and len(top) == main.STATS_TOP_OFFENDERS
+    # У каждого пользователя по 20 наказаний: обе страницы /history
+    results["/history"], (rows, has_more) = slowest(
+        main.get_punishment_history, chat_id, 10_001
+    )
+    assert has_more
+    results["/history, вторая страница"], (rows, has_more) = slowest(
+        main.get_punishment_history, chat_id, 10_001, rows[-1][0]
+    )
+    assert len(rows) == main.HISTORY_PAGE_SIZE and not has_more
+    for name, elapsed in results.items():
+        print(f"{name}: {elapsed * 1000:.1f} мс")
+    assert max(results.values()) < 0.1
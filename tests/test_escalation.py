@@ -0,0 +1,110 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest
+
+import main
+from main import EscalationRule, evaluate_escalation
+
+
+def record(warns=0, bans=0):
+    return {"warns": warns, "bans": bans}
+
+
+@pytest.mark.parametrize(
+    "warns, bans, punishment_type, expected",
+    [
+        (0, 0, "warn", None),
+        (2, 0, "warn", None),
+        (3, 0, "warn", EscalationRule("warns", 3, "mute", 60)),
+        (4, 0, "warn", EscalationRule("warns", 3, "mute", 60)),
+        (5, 0, "warn", EscalationRule("warns", 5, "ban", 24)),
+        (9, 0, "warn", EscalationRule("warns", 5, "ban", 24)),
+        # Счётчик банов не проверяется после предупреждения и наоборот
+        (1, 5, "warn", None),
+        (9, 1, "ban", None),
+        (0, 2, "ban", EscalationRule("bans", 2, "ban", 24 * 30)),
+        (7, 3, "ban", EscalationRule("bans", 2, "ban", 24 * 30)),
+        # Для мьютов и прочего политики нет
+        (9, 9, "mute", None),
+    ],
+)
+def test_default_policy(warns, bans, punishment_type, expected):
+    assert evaluate_escalation(record(warns, bans), punishment_type) == expected
+
+
+@pytest.mark.parametrize(
+    "rules, warns, expected",
+    [
+        ((), 3, EscalationRule("warns", 3, "mute", 60)),
+        ((("warns", 2, "ban", 48),), 1, None),
+        ((("warns", 2, "ban", 48),), 2, EscalationRule("warns", 2, "ban", 48)),
+        # Срабатывает первое подходящее правило
+        ((("warns", 2, "mute", 10), ("warns", 4, "ban", 1)), 5,
+         EscalationRule("warns", 2, "mute", 10)),
+    ],
+)
+def test_chat_policy(rules, warns, expected):
+    policy = main.escalation_policy(rules)
+    assert evaluate_escalation(record(warns), "warn", policy) == expected
+
+
+def test_parse_escalation_rejects_unknown_actions():
+    assert main._parse_escalation([["warns", "2", "ban", "48"]]) == (("warns", 2, "ban", 48),)
+    with pytest.raises(ValueError):
+        main._parse_escalation([["warns", 2, "kick", 1]])
+
+
+def test_describe_escalation():
+    assert main.describe_escalation(EscalationRule("warns", 3, "mute", 60)) == (
+        "мьют на 60 минут (warns ≥ 3)"
+    )
+
+
+def test_evaluate_escalation_benchmark():
+    records = [record(warns % 7, warns % 3) for warns in range(1000)]
+    calls = 200_000
+    started = time.perf_counter()
+    for n in range(calls):
+        evaluate_escalation(records[n % 1000], "warn")
+    per_call = (time.perf_counter() - started) / calls
+    print(f"evaluate_escalation: {per_call * 1e6:.2f} мкс на вызов")
+    assert per_call < 20e-6
+
+
+def test_warn_command_survives_failed_escalation(monkeypatch):
+    replies, logs = [], []
+
+    async def get_admin_route(update, context):
+        return main.DEFAULT_ROUTE
+
+    async def run_db(func, *args):
+        assert func is main.add_punishment
+        return {"warns": 3, "bans": 0}
+
+    async def restrict_chat_member(**kwargs):
+        raise BadRequest("Can't remove chat owner")
+
+    async def reply_text(text):
+        replies.append(text)
+
+    async def delete_command_message(update):
+        pass
+
+    monkeypatch.setattr(main, "get_admin_route", get_admin_route)
+    monkeypatch.setattr(main, "run_db", run_db)
+    monkeypatch.setattr(main, "delete_command_message", delete_command_message)
+    monkeypatch.setattr(main, "enqueue_log", lambda text, route=None: logs.append(text))
+    monkeypatch.setattr(main, "_effects_slots", asyncio.Semaphore(1))
+    message = SimpleNamespace(
+        reply_text=reply_text, from_user=SimpleNamespace(id=1, first_name="Admin")
+    )
+    update = SimpleNamespace(effective_message=message)
+    context = SimpleNamespace(
+        args=["42", "спам", "3"], bot=SimpleNamespace(restrict_chat_member=restrict_chat_member)
+    )
+    asyncio.run(main.warn_command(update, context))
+    assert replies == ["Пользователю 42 выдано предупреждение. Всего предупреждений: 3."]
+    assert len(logs) == 1 and logs[0].startswith("ПРЕДУПРЕЖДЕНИЕ:")
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+RAID_TEXT = "Заходите в наш канал, там раздают призы"  # 39 символов
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(main, "_flood_by_user", OrderedDict())
+    monkeypatch.setattr(main, "_flood_by_content", OrderedDict())
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_every_raid_message_after_threshold_is_caught(clock):
+    results = []
+    for account in range(20):
+        clock[0] += 0.5
+        results.append(main.check_flood(1, 10_000 + account, RAID_TEXT))
+    assert results[: main.DUPLICATE_MAX_MESSAGES] == [None] * main.DUPLICATE_MAX_MESSAGES
+    assert results[main.DUPLICATE_MAX_MESSAGES:] == (
+        ["Рассылка одинаковых сообщений"] * (20 - main.DUPLICATE_MAX_MESSAGES)
+    )
+
+
+def test_raid_text_stays_hot_while_it_keeps_coming(clock):
+    for account in range(main.DUPLICATE_MAX_MESSAGES + 1):
+        main.check_flood(1, account, RAID_TEXT)
+    # Реже лимита, но каждый раз внутри окна после предыдущего срабатывания
+    for account in range(5):
+        clock[0] += main.DUPLICATE_WINDOW - 1
+        assert main.check_flood(1, 100 + account, RAID_TEXT) is not None
+
+
+def test_raid_text_cools_down_after_window(clock):
+    for account in range(main.DUPLICATE_MAX_MESSAGES + 1):
+        main.check_flood(1, account, RAID_TEXT)
+    clock[0] += main.DUPLICATE_WINDOW + 1
+    assert main.check_flood(1, 100, RAID_TEXT) is None
+
+
+def test_user_flood_resets_after_hit(clock):
+    results = []
+    for n in range(main.FLOOD_MAX_MESSAGES + 2):
+        clock[0] += 0.1
+        results.append(main.check_flood(1, 42, f"сообщение {n}"))
+    assert results[main.FLOOD_MAX_MESSAGES] == "Флуд"
+    assert results[main.FLOOD_MAX_MESSAGES + 1] is None
+
+
+def test_flood_is_counted_per_chat(clock):
+    for n in range(main.FLOOD_MAX_MESSAGES):
+        assert main.check_flood(1, 42, f"сообщение {n}") is None
+    assert main.check_flood(2, 42, "сообщение в другом чате") is None
+    assert main.check_flood(1, 42, "ещё одно") == "Флуд"
+
+
+def test_admin_is_not_muted_for_flood(monkeypatch):
+    route = main.DEFAULT_ROUTE
+    muted = []
+
+    async def is_chat_admin(user_id, chat_id, context):
+        return True
+
+    async def mute(*args):
+        muted.append(args)
+
+    monkeypatch.setattr(main, "check_flood", lambda *args: "Флуд")
+    monkeypatch.setattr(main, "is_chat_admin", is_chat_admin)
+    monkeypatch.setattr(main, "_mute_for_flood", mute)
+    monkeypatch.setattr(main, "check_violation", lambda *args: False)
+    monkeypatch.setattr(main, "TOXICITY_MODEL", None)
+    message = SimpleNamespace(
+        text="объявление",
+        chat=SimpleNamespace(id=route.chat_id),
+        from_user=SimpleNamespace(id=1, username="admin", first_name="Admin"),
+    )
+    update = SimpleNamespace(effective_message=message)
+    asyncio.run(main.handle_message(update, SimpleNamespace(bot=None)))
+    assert muted == []
+
+
+def test_check_flood_benchmark_100k_active_users(monkeypatch):
+    monkeypatch.setattr(main, "_flood_by_user", OrderedDict())
+    monkeypatch.setattr(main, "_flood_by_content", OrderedDict())
+    users = 100_000
+    texts = [f"{RAID_TEXT} {n}" for n in range(users)]
+    # Каждый из 100k пользователей пишет по три разных сообщения
+    calls = 3 * users
+    started = time.perf_counter()
+    for n in range(calls):
+        main.check_flood(1, n % users, texts[(n * 7919) % users])
+    per_call = (time.perf_counter() - started) / calls
+    tracked = len(main._flood_by_user) + len(main._flood_by_content)
+    print(
+        f"check_flood, {users} активных пользователей: {per_call * 1e6:.2f} мкс "
+        f"на сообщение, отслеживается ключей: {tracked}"
+    )
+    # Горячий путь: с большим запасом укладывается в десятки микросекунд
+    assert per_call < 50e-6
+    # Память ограничена: вытесняются самые давние пользователи и тексты
+    assert len(main._flood_by_user) <= main.FLOOD_TRACKED_KEYS
+    assert len(main._flood_by_content) <= main.FLOOD_TRACKED_KEYS
@@ -0,0 +1,59 @@
+import random
+import re
+import time
+
+import pytest
+
+import main
+import replay
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+@pytest.fixture(scope="module")
+def keywords():
+    rng = random.Random(0)
+    return [
+        "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 10)))
+        for _ in range(10_000)
+    ]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    # Обычные сообщения чата: матчер проходит их целиком
+    return [f"{text} ({n})" for n in range(200) for text in replay.SAMPLE_TEXTS]
+
+
+def per_message(func, messages):
+    started = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - started) / len(messages)
+
+
+def test_matcher_reports_term_and_scales_flat(monkeypatch, keywords, corpus):
+    costs = {}
+    for size in (100, 1_000, 10_000):
+        started = time.perf_counter()
+        matcher = main.build_keyword_matcher(keywords[:size])
+        build = time.perf_counter() - started
+        monkeypatch.setattr(main, "BANNED_MATCHER", matcher)
+        costs[size] = per_message(main.find_violation, corpus)
+        print(
+            f"{size} слов: сборка {build * 1000:.0f} мс, "
+            f"{costs[size] * 1e6:.1f} мкс на сообщение"
+        )
+        term = keywords[size - 1]
+        assert main.find_violation(f"ну ты {term}!") == main.normalize_text(term)
+
+    # Прежняя проверка: своё регулярное выражение на каждое слово
+    patterns = [re.compile(r"\b" + re.escape(word) + r"\b") for word in keywords]
+    naive = per_message(
+        lambda text: any(pattern.search(text.lower()) for pattern in patterns), corpus[:50]
+    )
+    print(f"10000 слов, отдельные выражения: {naive * 1e6:.0f} мкс на сообщение")
+
+    assert costs[10_000] < 3 * costs[100]
+    assert costs[10_000] < 500e-6
+    assert costs[10_000] * 10 < naive
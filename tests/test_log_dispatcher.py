@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+import main
+
+_real_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """Подменяет time.monotonic и asyncio.sleep: ожидание лишь переводит часы."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+        await _real_sleep(0)
+
+
+class FakeBot:
+    def __init__(self, clock, fail_first=0):
+        self.clock = clock
+        self.sent = []
+        self.fail_first = fail_first
+
+    async def send_message(self, chat_id, message_thread_id, text):
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RetryAfter(7)
+        self.sent.append((self.clock.now, chat_id, message_thread_id, text))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(main.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(asyncio, "sleep", fake.sleep)
+    monkeypatch.setattr(main, "_log_queue", asyncio.Queue(maxsize=main.LOG_QUEUE_MAX_SIZE))
+    monkeypatch.setattr(main, "_log_buckets", {})
+    return fake
+
+
+def violation_log(n):
+    return (
+        f"Автоматическое предупреждение: пользователь @raider{n} (ID: {100000 + n}) "
+        f"нарушил правила. Всего предупреждений: 1."
+    )
+
+
+def test_pack_log_messages_respects_limit_and_order():
+    texts = [violation_log(n) for n in range(500)] + ["x" * 10000]
+    messages = main.pack_log_messages(texts)
+    assert all(len(message) <= main.TELEGRAM_MESSAGE_LIMIT for message in messages)
+    assert "".join(messages).replace("\n\n", "") == "".join(texts)
+
+
+def test_burst_of_1000_violations_is_coalesced_and_rate_limited(clock):
+    bot = FakeBot(clock)
+    texts = [violation_log(n) for n in range(1000)]
+    for text in texts:
+        main.enqueue_log(text)
+    asyncio.run(main.flush_logs(bot))
+
+    print(f"Вызовов send_message: {len(bot.sent)} вместо {len(texts)}")
+    total_length = sum(len(text) + 2 for text in texts)
+    assert len(bot.sent) <= total_length // main.TELEGRAM_MESSAGE_LIMIT + 2
+    assert "\n\n".join(text for *_, text in bot.sent) == "\n\n".join(texts)
+    route = main.DEFAULT_ROUTE
+    assert {(chat, thread) for _, chat, thread, _ in bot.sent} == {
+        (route.admin_group_id, route.logs_thread_id)
+    }
+    # После первых LOG_BURST сообщений — не чаще LOG_MESSAGES_PER_MINUTE в минуту
+    rate = main.LOG_MESSAGES_PER_MINUTE / 60
+    for index, (sent_at, *_) in enumerate(bot.sent):
+        assert sent_at >= (index + 1 - main.LOG_BURST) / rate - 1e-6
+
+
+def test_retry_after_is_honoured(clock):
+    bot = FakeBot(clock, fail_first=2)
+    main.enqueue_log("событие")
+    asyncio.run(main.flush_logs(bot))
+    assert len(bot.sent) == 1
+    assert bot.sent[0][0] >= 14
+    assert main.METRICS["log_messages_failed"] == 0
+
+
+def test_destinations_are_sent_separately(clock):
+    bot = FakeBot(clock)
+    other = main.ChatRoute(-1, -2, 3, 4)
+    main.enqueue_log("основной чат")
+    main.enqueue_log("другой чат", other)
+    asyncio.run(main.flush_logs(bot))
+    assert {(chat, thread, text) for _, chat, thread, text in bot.sent} == {
+        (-2, 4, "другой чат"),
+        (main.ADMIN_GROUP_ID, main.LOGS_THREAD_ID, "основной чат"),
+    }
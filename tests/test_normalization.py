@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+import main
+
+KEYWORDS = ["запрещенное", "спамслово", "требуются сотрудники"]
+
+# Обходы, которые встречались в чате: каждая строка должна находиться
+OBFUSCATED = [
+    "тут запрещенное слово",
+    "ЗАПРЕЩЕННОЕ",
+    "зaпрещеннoе",                          # латинские a и o
+    "з\u200bапрещ\u200dенное",            # невидимые символы
+    "з.а.п.р.е.щ.е.н.н.о.е",
+    "з-а-п-р-е-щ-е-н-н-о-е",
+    "з а п р е щ е н н о е",
+    "з. а. п. р. е. щ. е. н. н. о. е",
+    "запрееещеннооое",
+    "зап*рещенное",
+    "cпaмcлoвo",                            # латинские c, a, o
+    "ｃｎａｍслово",                         # полноширинные латинские c, n, a, m (NFKC)
+    "спам\u00adслово",                      # мягкий перенос
+    "сп@мслово",
+    "cпамсл0во",                            # цифра 0
+    "спаааамслово!!!",
+    "Требуются сотрудники, пишите в лс",
+    "ТРЕБУЮТСЯ  СОТРУДНИКИ",
+    "тpeбуютcя coтpудники",
+    "требуютсяяя сотрудникииии",
+]
+
+# Обычные сообщения не должны срабатывать
+CLEAN = [
+    "Подскажите, как типизировать generic-компонент в React?",
+    "обсуждаем запрещенные технологии",
+    "спам в чате надоел",
+    "требуется помощь с сотрудниками отдела",
+    "Спасибо, заработало",
+    "a.b.c.d",
+]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return main.build_keyword_matcher([main.normalize_text(word) for word in KEYWORDS])
+
+
+def test_obfuscated_catch_rate(matcher):
+    caught = [text for text in OBFUSCATED if matcher.search(main.normalize_text(text))]
+    baseline = [
+        text for text in OBFUSCATED
+        if main.build_keyword_matcher(KEYWORDS).search(text.lower())
+    ]
+    print(
+        f"Найдено после нормализации: {len(caught)}/{len(OBFUSCATED)}, "
+        f"по text.lower(): {len(baseline)}/{len(OBFUSCATED)}"
+    )
+    assert set(OBFUSCATED) - set(caught) == set()
+
+
+# Слова, соединённые дефисом или косой чертой: склейка не должна прятать их от матчера
+JOINED = [
+    ("ну ты сука-бля", "сука"),
+    ("сука/блядь", "сука"),
+    ("кто-то сказал бля-бля", "бля"),
+    ("спамслово-запрещенное", "спамслово"),
+    ("требуются сотрудники/курьеры", "требуются сотрудники"),
+]
+
+
+@pytest.mark.parametrize("text, term", JOINED)
+def test_joined_words_are_still_caught(monkeypatch, text, term):
+    keywords = KEYWORDS + ["сука", "бля", "блядь"]
+    monkeypatch.setattr(main, "BANNED_MATCHER", main.build_keyword_matcher(keywords))
+    violation = main.find_violation(text)
+    assert violation is not None
+    assert violation == main.normalize_text(term)
+
+
+@pytest.mark.parametrize("text", CLEAN)
+def test_clean_messages_do_not_match(matcher, text):
+    assert matcher.search(main.normalize_text(text)) is None
+
+
+def test_find_violation_uses_normalized_text(monkeypatch, matcher):
+    monkeypatch.setattr(main, "BANNED_MATCHER", matcher)
+    violation = main.find_violation("ну и з.а.п.р.е.щ.е.н.н.о.е")
+    assert violation is not None
+    assert violation == main.normalize_text("запрещенное")
+    assert main.check_violation("всё в порядке") is False
+
+
+def test_normalize_text_benchmark():
+    texts = [f"{text} ({n})" for n, text in enumerate((OBFUSCATED + CLEAN) * 100)]
+    started = time.perf_counter()
+    for text in texts:
+        main.normalize_text(text)
+    per_message = (time.perf_counter() - started) / len(texts)
+    print(f"normalize_text: {per_message * 1e6:.2f} мкс на сообщение")
+    assert per_message < 100e-6
@@ -0,0 +1,263 @@
+import asyncio
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest
+
+import main
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.db.queries.append(query)
+
+    def fetchone(self):
+        # Пользователя в БД ещё нет
+        return None
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+
+class FakeDB:
+    def __init__(self):
+        self.queries = []
+        self.written = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+    def write_punishments(self, cur, events):
+        with self.lock:
+            self.written.extend(events)
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    fake = FakeDB()
+    monkeypatch.setattr(main, "db_connection", fake.connection)
+    monkeypatch.setattr(main, "_write_punishments", fake.write_punishments)
+    monkeypatch.setattr(main, "_user_cache", OrderedDict())
+    monkeypatch.setattr(main, "_pending_punishments", [])
+    monkeypatch.setattr(main, "_unflushed_users", defaultdict(int))
+    monkeypatch.setattr(main, "_journal_file", None)
+    monkeypatch.setattr(main, "USER_JOURNAL_FILE", str(tmp_path / "punishments.journal"))
+    yield fake
+    if main._journal_file is not None:
+        main._journal_file.close()
+
+
+def test_parallel_warns_to_one_user_are_counted_exactly(db):
+    chat_id, user_id = main.FRONTEND_CHAT_ID, 4242
+
+    async def warn_in_parallel():
+        return await asyncio.gather(
+            *(
+                main.run_db(
+                    main.add_punishment, chat_id, user_id, "user", "warn", "спам", 3, "admin"
+                )
+                for _ in range(100)
+            )
+        )
+
+    records = asyncio.run(warn_in_parallel())
+    # Каждое предупреждение видит свой счётчик: ни одно не потеряно и не задвоено
+    assert sorted(record["warns"] for record in records) == list(range(1, 101))
+    assert main._user_cache[(chat_id, user_id)]["warns"] == 100
+    assert main._unflushed_users[(chat_id, user_id)] == 100
+
+    assert main.flush_user_cache() == 100
+    assert len(db.written) == 100
+    assert len({event["event_id"] for event in db.written}) == 100
+    assert all(main._event_key(event) == (chat_id, user_id) for event in db.written)
+    assert not main._unflushed_users
+    assert not main._pending_punishments
+
+
+def test_journal_replays_unflushed_warns(db):
+    for _ in range(5):
+        main.add_punishment(main.FRONTEND_CHAT_ID, 7, "user", "warn", "спам", 3, "admin")
+    # Процесс упал до сброса: буфер в памяти потерян, журнал остался
+    main._pending_punishments.clear()
+    main._unflushed_users.clear()
+    main._journal_file.close()
+    main._journal_file = None
+
+    assert main.recover_user_journal() == 5
+    assert len(db.written) == 5
+
+
+def test_journal_is_fsynced_once_per_batch(db, monkeypatch):
+    synced = []
+    monkeypatch.setattr(main.os, "fsync", synced.append)
+    monkeypatch.setattr(main, "flush_user_cache", lambda: 0)
+    main.add_punishment(main.FRONTEND_CHAT_ID, 1, "user", "warn", "спам", 3, "admin")
+    assert len(synced) == 1
+    main.add_punishments(main.FRONTEND_CHAT_ID, range(2, 102), "ban", "рейд", 24, "admin")
+    assert len(synced) == 2
+    # К моменту fsync все события пачки уже в файле
+    with open(main.USER_JOURNAL_FILE, encoding="utf-8") as f:
+        assert len(f.readlines()) == 101
+
+def test_add_punishments_counts_only_its_own_saved_events(db, monkeypatch):
+    chat_id = main.FRONTEND_CHAT_ID
+    main.add_punishment(chat_id, 1, "user", "warn", "спам", 3, "admin")
+    # В буфере уже лежало чужое событие: в счёт массовой команды оно не входит
+    assert main.add_punishments(chat_id, [2, 3], "ban", "рейд", 24, "admin") == 2
+    assert len(db.written) == 3
+
+    def unavailable(cur, events):
+        raise main.psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(main, "_write_punishments", unavailable)
+    assert main.add_punishments(chat_id, [4, 5], "ban", "рейд", 24, "admin") == 0
+    assert len(main._pending_punishments) == 2
+
+
+def test_mass_action_reports_failures_instead_of_success(monkeypatch):
+    replies, logs = [], []
+
+    class Bot:
+        id = 1
+
+        async def ban_chat_member(self, chat_id, user_id):
+            if user_id == 12:
+                raise BadRequest("User_not_participant")
+
+    class Message:
+        from_user = SimpleNamespace(id=7, first_name="Admin")
+
+        async def reply_text(self, text):
+            replies.append(text)
+
+    async def get_admin_route(update, context):
+        return main.DEFAULT_ROUTE
+
+    async def get_chat_admin_ids(bot, chat_id):
+        return frozenset({7})
+
+    async def run_db(func, *args):
+        return func(*args)
+
+    async def schedule_jobs(kind, payloads, run_at):
+        raise main.psycopg2.OperationalError("connection refused")
+
+    async def noop(*args):
+        pass
+
+    monkeypatch.setattr(main, "get_admin_route", get_admin_route)
+    monkeypatch.setattr(main, "get_chat_admin_ids", get_chat_admin_ids)
+    monkeypatch.setattr(main, "delete_command_message", noop)
+    monkeypatch.setattr(main, "run_db", run_db)
+    # БД недоступна: наказания остались только в журнале
+    monkeypatch.setattr(main, "add_punishments", lambda *args: 0)
+    monkeypatch.setattr(main, "schedule_jobs", schedule_jobs)
+    monkeypatch.setattr(main, "enqueue_log", lambda text, route=None: logs.append(text))
+    update = SimpleNamespace(effective_message=Message())
+    context = SimpleNamespace(bot=Bot(), args=["11", "12", "13", "рейд", "24"])
+
+    asyncio.run(main.mass_action_command(update, context, "massban"))
+    (reply,) = replies
+    assert "2 из 3" in reply
+    assert "ошибок Telegram: 1 (ID: 12)" in reply
+    assert "не записано в БД: 2" in reply
+    assert "разбан не запланирован" in reply
+    assert "ID: 11, 13" in logs[0]
+
+
+def _user_counters(main_module, chat_id, user_id):
+    with main_module.db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT warns, (SELECT count(*) FROM {main_module.SCHEMA}.punishments "
+                f"WHERE chat_id = %s AND user_id = %s) "
+                f"FROM {main_module.SCHEMA}.users WHERE chat_id = %s AND user_id = %s;",
+                (chat_id, user_id, chat_id, user_id),
+            )
+            return cur.fetchone()
+
+
+def test_concurrent_upserts_do_not_lose_increments(postgres):
+    """Узлы кластера сбрасывают наказания одного пользователя одновременно."""
+    main = postgres
+    chat_id, user_id = main.FRONTEND_CHAT_ID, 4242
+    # Каждый поток держит соединение из пула до барьера, поэтому их меньше DB_POOL_MAX_SIZE
+    nodes = main.DB_POOL_MAX_SIZE - 2
+    batches = [
+        [
+            {
+                "event_id": f"{node}-{n}",
+                "chat_id": chat_id,
+                "user_id": user_id,
+                "alias": "user",
+                "type": "warn",
+                "reason": "спам",
+                "duration": 3,
+                "issued_by": "admin",
+                "issued_at": "2026-01-01 00:00:00",
+            }
+            for n in range(10)
+        ]
+        for node in range(nodes)
+    ]
+    barrier = threading.Barrier(nodes)
+
+    def flush(events, barrier=None):
+        with main.db_connection() as conn:
+            with conn.cursor() as cur:
+                if barrier is not None:
+                    barrier.wait()
+                main._write_punishments(cur, events)
+
+    threads = [threading.Thread(target=flush, args=(events, barrier)) for events in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _user_counters(main, chat_id, user_id) == (nodes * 10, nodes * 10)
+
+    # Повторная запись тех же событий (например, из журнала) ничего не меняет
+    flush(batches[0])
+    assert _user_counters(main, chat_id, user_id) == (nodes * 10, nodes * 10)
+
+
+def test_parallel_warns_reach_the_database_exactly(postgres, monkeypatch):
+    main = postgres
+    monkeypatch.setattr(main, "_user_cache", OrderedDict())
+    monkeypatch.setattr(main, "_pending_punishments", [])
+    monkeypatch.setattr(main, "_unflushed_users", defaultdict(int))
+    chat_id, user_id = main.FRONTEND_CHAT_ID, 4343
+
+    async def warn_and_flush():
+        return await asyncio.gather(
+            *(
+                main.run_db(
+                    main.add_punishment, chat_id, user_id, "user", "warn", "спам", 3, "admin"
+                )
+                for _ in range(100)
+            ),
+            *(main.run_db(main.flush_user_cache) for _ in range(10)),
+        )
+
+    asyncio.run(warn_and_flush())
+    main.flush_user_cache()
+    assert _user_counters(main, chat_id, user_id) == (100, 100)
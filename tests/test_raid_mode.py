@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from telegram import ChatPermissions
+from telegram.error import NetworkError
+
+import main
+
+CHAT_PERMISSIONS = ChatPermissions(
+    can_send_messages=True,
+    can_send_photos=True,
+    can_send_polls=False,
+    can_add_web_page_previews=True,
+    can_invite_users=False,
+    can_pin_messages=False,
+)
+
+
+class FakeBot:
+    def __init__(self, permissions=CHAT_PERMISSIONS, fail=False):
+        self.permissions = permissions
+        self.fail = fail
+        self.calls = []
+
+    async def get_chat(self, chat_id):
+        self.calls.append("get_chat")
+        if self.fail:
+            raise NetworkError("timed out")
+        return SimpleNamespace(permissions=self.permissions)
+
+    async def set_chat_permissions(self, chat_id, permissions):
+        self.calls.append("set_chat_permissions")
+        self.permissions = permissions
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    scheduled = []
+
+    async def schedule_job(kind, payload, run_at):
+        scheduled.append((kind, payload, run_at))
+        return len(scheduled)
+
+    async def run_db(func, *args):
+        return func(*args)
+
+    def find_scheduled_job(kind, chat_id):
+        for job_id, (job_kind, payload, run_at) in enumerate(scheduled, start=1):
+            if job_kind == kind and payload["chat_id"] == chat_id:
+                return job_id, payload, run_at
+        return None
+
+    monkeypatch.setattr(main, "schedule_job", schedule_job)
+    monkeypatch.setattr(main, "run_db", run_db)
+    monkeypatch.setattr(main, "find_scheduled_job", find_scheduled_job)
+    monkeypatch.setattr(main, "enqueue_log", lambda text, route=None: None)
+    monkeypatch.setattr(main, "_raid_mode_until", {})
+    monkeypatch.setattr(main, "_raid_mode_retry_at", {})
+    return scheduled
+
+
+def test_raid_off_restores_every_previous_permission(jobs):
+    bot = FakeBot()
+    route = main.DEFAULT_ROUTE
+    assert asyncio.run(main.enable_raid_mode(bot, route, "тест"))
+    assert bot.permissions == ChatPermissions.no_permissions()
+    (kind, payload, _), = jobs
+    asyncio.run(main.raid_off_job(bot, payload))
+    assert bot.permissions == CHAT_PERMISSIONS
+    assert not main.raid_mode_active(route.chat_id)
+
+
+def test_failed_attempt_is_not_retried_on_every_join(jobs):
+    bot = FakeBot(fail=True)
+    route = main.DEFAULT_ROUTE
+    for _ in range(10):
+        assert not asyncio.run(main.enable_raid_mode(bot, route, "тест"))
+    assert bot.calls == ["get_chat"]
+    assert jobs == []
+
+
+def test_unknown_permissions_leave_chat_open(jobs):
+    bot = FakeBot(permissions=None)
+    assert not asyncio.run(main.enable_raid_mode(bot, main.DEFAULT_ROUTE, "тест"))
+    assert "set_chat_permissions" not in bot.calls
+    assert jobs == []
+
+
+def test_restart_during_raid_keeps_pending_restore(jobs):
+    route = main.DEFAULT_ROUTE
+    run_at = datetime.now() + timedelta(minutes=10)
+    jobs.append(
+        ("raid_off", {"chat_id": route.chat_id, "permissions": CHAT_PERMISSIONS.to_dict()}, run_at)
+    )
+    bot = FakeBot(permissions=ChatPermissions.no_permissions())
+    assert asyncio.run(main.enable_raid_mode(bot, route, "тест"))
+    # Новая задача с урезанными правами не создаётся, чат не трогаем
+    assert len(jobs) == 1
+    assert bot.calls == ["get_chat"]
+    assert main.raid_mode_active(route.chat_id)
+
+
+def test_chat_closed_by_admins_is_not_reopened(jobs):
+    bot = FakeBot(permissions=ChatPermissions.no_permissions())
+    assert not asyncio.run(main.enable_raid_mode(bot, main.DEFAULT_ROUTE, "тест"))
+    assert jobs == []
+    assert bot.calls == ["get_chat"]
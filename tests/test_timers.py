@@ -0,0 +1,138 @@
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+import main
+
+
+class FakeDB:
+    """Подменяет run_db: хранит задачи в словаре и записывает вызовы."""
+
+    def __init__(self, jobs=()):
+        self.jobs = {job_id: (kind, payload, run_at) for job_id, kind, payload, run_at in jobs}
+        self.deleted = []
+        self.rescheduled = []
+
+    async def run_db(self, func, *args):
+        if func is main.load_scheduled_jobs:
+            return [(job_id, *job) for job_id, job in self.jobs.items()]
+        if func is main.delete_scheduled_job:
+            self.deleted.append(args[0])
+            self.jobs.pop(args[0], None)
+            return None
+        if func is main.reschedule_scheduled_job:
+            self.rescheduled.append(args)
+            return None
+        raise AssertionError(f"неожиданный вызов {func.__name__}")
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    monkeypatch.setattr(main, "_timer_heap", [])
+    monkeypatch.setattr(main, "_timer_job_ids", set())
+    monkeypatch.setattr(main, "_timer_wakeup", asyncio.Event())
+    monkeypatch.setattr(main, "TIMER_HANDLERS", {})
+    db = FakeDB()
+    monkeypatch.setattr(main, "run_db", db.run_db)
+    return db
+
+
+def test_dispatcher_runs_100k_jobs_in_order_on_simulated_clock(timers):
+    rng = random.Random(1)
+    deadlines = {job_id: rng.randrange(1, 10_000) for job_id in range(1, 100_001)}
+    timers.jobs = {
+        job_id: ("test", {"n": job_id}, datetime.fromtimestamp(1_000_000 + deadline))
+        for job_id, deadline in deadlines.items()
+    }
+    now = [1_000_000.0]
+    executed = []
+
+    async def handler(bot, payload):
+        # Задача не должна выполниться раньше срока
+        assert deadlines[payload["n"]] <= now[0] - 1_000_000
+        executed.append(payload["n"])
+
+    main.TIMER_HANDLERS["test"] = handler
+
+    async def scenario():
+        dispatcher = asyncio.create_task(
+            main.run_timer_dispatcher(None, clock=lambda: now[0])
+        )
+        for step in range(0, 10_001, 500):
+            now[0] = 1_000_000 + step
+            main._timer_wakeup.set()
+            expected = sum(1 for deadline in deadlines.values() if deadline <= step)
+            while len(executed) < expected:
+                await asyncio.sleep(0)
+            assert len(executed) == expected
+        dispatcher.cancel()
+
+    asyncio.run(scenario())
+    assert sorted(executed) == sorted(deadlines)
+    assert len(timers.deleted) == 100_000
+    assert not main._timer_job_ids
+
+
+def _run_job(handler, payload=None, job_id=7, clock=lambda: 1_000_000.0):
+    main.TIMER_HANDLERS["test"] = handler
+    asyncio.run(
+        main._run_timer_job(
+            None, job_id, "test", payload or {}, asyncio.Semaphore(1), clock
+        )
+    )
+
+
+def test_network_error_reschedules_with_backoff(timers):
+    async def handler(bot, payload):
+        raise NetworkError("connection reset")
+
+    _run_job(handler)
+    assert timers.deleted == []
+    (job_id, payload, run_at), = timers.rescheduled
+    assert job_id == 7 and payload["attempts"] == 1
+    assert run_at == datetime.fromtimestamp(1_000_000 + main.TIMER_RETRY_BASE)
+
+    timers.rescheduled.clear()
+    _run_job(handler, {"attempts": 3})
+    (_, payload, run_at), = timers.rescheduled
+    assert payload["attempts"] == 4
+    assert run_at == datetime.fromtimestamp(1_000_000 + main.TIMER_RETRY_BASE * 8)
+    assert [entry[2] for entry in main._timer_heap] == [7, 7]
+
+
+def test_retry_after_uses_telegram_delay(timers):
+    async def handler(bot, payload):
+        raise RetryAfter(12)
+
+    _run_job(handler)
+    (_, _, run_at), = timers.rescheduled
+    assert run_at == datetime.fromtimestamp(1_000_000 + 12)
+
+
+def test_bad_request_is_permanent(timers):
+    async def handler(bot, payload):
+        raise BadRequest("User not found")
+
+    _run_job(handler)
+    assert timers.deleted == [7]
+    assert timers.rescheduled == []
+
+
+def test_job_is_dropped_after_max_attempts(timers):
+    async def handler(bot, payload):
+        raise NetworkError("timeout")
+
+    _run_job(handler, {"attempts": main.TIMER_MAX_ATTEMPTS - 1})
+    assert timers.deleted == [7]
+    assert timers.rescheduled == []
+
+
+def test_success_deletes_job(timers):
+    async def handler(bot, payload):
+        pass
+
+    _run_job(handler)
+    assert timers.deleted == [7]
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Обучение и замер модели токсичности (второй этап проверки сообщений).
+
+Размеченный файл — строки вида "метка<TAB>текст", где метка 1 означает
+токсичное сообщение, 0 — нормальное. Модель — логистическая регрессия по
+хэшированным символьным n-граммам (признаки те же, что в main.toxicity_features);
+результат сохраняется в main.TOXICITY_MODEL_FILE и подхватывается ботом при
+запуске или по /reloadkeywords.
+
+Примеры:
+    python train_toxicity.py train labeled.tsv
+    python train_toxicity.py benchmark --corpus labeled.tsv
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+import main
+
+SAMPLE_TEXTS = [
+    "Привет всем! Кто-нибудь настраивал vite с monorepo?",
+    "Подскажите, как типизировать generic-компонент в React?",
+    "Спасибо, заработало",
+    "А есть хороший курс по CSS grid?",
+    "Посмотрите мой PR, пожалуйста",
+]
+
+
+def load_labeled(path: str):
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            label, separator, text = line.partition("\t")
+            if not separator or label not in ("0", "1"):
+                raise SystemExit(f"{path}:{line_number}: ожидается 'метка<TAB>текст'")
+            texts.append(text)
+            labels.append(int(label))
+    return texts, np.array(labels, dtype=np.float64)
+
+
+# ========= Обучение =========
+def train(texts, labels, epochs: int, learning_rate: float, l2: float):
+    """
+    Полный градиентный спуск с AdaGrad: на каждой эпохе все тексты оцениваются
+    одним bincount, градиент по весам собирается вторым.
+    """
+    rows, columns, values = main.toxicity_features(texts)
+    count = len(texts)
+    weights = np.zeros(main.TOXICITY_FEATURES, dtype=np.float64)
+    squared = np.full(main.TOXICITY_FEATURES, 1e-8)
+    bias, bias_squared = 0.0, 1e-8
+    for _ in range(epochs):
+        logits = np.bincount(rows, weights=weights[columns] * values, minlength=count) + bias
+        errors = 1 / (1 + np.exp(-logits)) - labels
+        gradient = np.bincount(
+            columns, weights=errors[rows] * values, minlength=main.TOXICITY_FEATURES
+        ) / count + l2 * weights
+        squared += gradient ** 2
+        weights -= learning_rate * gradient / np.sqrt(squared)
+        bias_gradient = errors.mean()
+        bias_squared += bias_gradient ** 2
+        bias -= learning_rate * bias_gradient / np.sqrt(bias_squared)
+    return main.ToxicityModel(weights.astype(np.float32), bias)
+
+
+def report_thresholds(model, texts, labels):
+    scores = main.score_texts(model, texts)
+    for name, threshold in (
+        ("удаление", main.TOXICITY_DELETE_THRESHOLD),
+        ("предупреждение", main.TOXICITY_WARN_THRESHOLD),
+    ):
+        flagged = scores >= threshold
+        true_positive = int((flagged & (labels == 1)).sum())
+        precision = true_positive / flagged.sum() if flagged.any() else 0.0
+        recall = true_positive / (labels == 1).sum() if (labels == 1).any() else 0.0
+        print(
+            f"  {name} (от {threshold}): точность {precision:.3f}, полнота {recall:.3f}, "
+            f"отмечено {int(flagged.sum())} из {len(texts)}"
+        )
+
+
+def train_command(args):
+    random.seed(args.seed)
+    texts, labels = load_labeled(args.labeled)
+    order = list(range(len(texts)))
+    random.shuffle(order)
+    holdout = int(len(order) * args.holdout)
+    test, fit = order[:holdout], order[holdout:]
+    started = time.perf_counter()
+    model = train(
+        [texts[i] for i in fit], labels[fit], args.epochs, args.learning_rate, args.l2
+    )
+    print(f"Обучено на {len(fit)} примерах за {time.perf_counter() - started:.1f} с.")
+    if test:
+        print(f"Отложенная выборка ({len(test)} примеров):")
+        report_thresholds(model, [texts[i] for i in test], labels[test])
+    np.savez_compressed(
+        args.out,
+        weights=model.weights,
+        bias=model.bias,
+        ngrams=np.array(main.TOXICITY_NGRAMS),
+        features=main.TOXICITY_FEATURES,
+    )
+    print(f"Модель сохранена в {args.out}.")
+
+
+# ========= Замер =========
+def benchmark_command(args):
+    """Сообщений в секунду при оценке пачками разного размера (только CPU)."""
+    random.seed(args.seed)
+    try:
+        model = main.load_toxicity_model(args.model)
+    except FileNotFoundError:
+        # Скорость не зависит от значений весов
+        print(f"{args.model} не найден, замер на случайных весах.")
+        weights = np.random.default_rng(args.seed).normal(size=main.TOXICITY_FEATURES)
+        model = main.ToxicityModel(weights.astype(np.float32), 0.0)
+    pool = load_labeled(args.corpus)[0] if args.corpus else SAMPLE_TEXTS
+    texts = [f"{random.choice(pool)} ({i})" for i in range(args.messages)]
+    print("Размер пачки | сообщений в секунду | мкс на сообщение")
+    for batch_size in args.batch_sizes:
+        main.score_texts(model, texts[:batch_size])
+        started = time.perf_counter()
+        for offset in range(0, len(texts), batch_size):
+            main.score_texts(model, texts[offset:offset + batch_size])
+        elapsed = time.perf_counter() - started
+        print(
+            f"{batch_size:12} | {len(texts) / elapsed:19.0f} | "
+            f"{elapsed / len(texts) * 1e6:16.1f}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="обучить модель по размеченному файлу")
+    train_parser.add_argument("labeled", help="файл 'метка<TAB>текст'")
+    train_parser.add_argument("--out", default=main.TOXICITY_MODEL_FILE)
+    train_parser.add_argument("--epochs", type=int, default=300)
+    train_parser.add_argument("--learning-rate", type=float, default=0.5)
+    train_parser.add_argument("--l2", type=float, default=1e-6)
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="доля отложенной выборки")
+    train_parser.add_argument("--seed", type=int, default=0)
+    benchmark_parser = commands.add_parser("benchmark", help="замерить скорость оценки")
+    benchmark_parser.add_argument("--model", default=main.TOXICITY_MODEL_FILE)
+    benchmark_parser.add_argument("--corpus", help="файл 'метка<TAB>текст' с примерами текстов")
+    benchmark_parser.add_argument("--messages", type=int, default=20000)
+    benchmark_parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 16, main.TOXICITY_MAX_BATCH]
+    )
+    benchmark_parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "train":
+        train_command(args)
+    else:
+        benchmark_command(args)